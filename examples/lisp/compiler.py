@@ -1,153 +1,221 @@
 import logging
-from functools import singledispatch
+from functools import lru_cache, partial
+from typing import Callable
 
-from itertools import islice
-
-from constructs import Form, builtin_functions, to_object, is_function_def, is_import, to_function, \
+from examples.lisp.constructs import Form, builtin_functions, to_object, is_function_def, is_import, to_function, \
     Function, Atom
 from parser.ast import AST
 
 logger = logging.getLogger("laxma.compiler")
 
+_BUILTINS = frozenset(builtin_functions())
+
+type BuiltinEmitter = Callable[[list], str]
+
+
+@lru_cache(maxsize=64)
+def _indent(level: int) -> str:
+    return ' ' * (level * 4)
+
 
 def compile_args(ast: AST):
-    return ", ".join(compile_obj(child) for child in islice(ast.children, 1, len(ast.children)))
+    return ", ".join(compile_obj(child) for child in ast.children[1:])
 
 
-@singledispatch
 def compile_obj(obj, indent: int = 0):
+    obj_type = type(obj)
+    if obj_type is Atom:
+        return _compile_atom(obj, indent)
+    if obj_type is Form:
+        return _compile_form(obj, indent)
     raise TypeError(f"Could not compile object {obj}")
 
 
-@compile_obj.register
-def _(obj: Atom, indent: int = 0):
-    current_indent = ' ' * (indent * 4)
+def _compile_atom(obj: Atom, indent: int = 0):
+    current_indent = _indent(indent)
     return f"{current_indent}{obj.value}"
 
 
-@compile_obj.register
-def _(obj: Form, indent: int = 0):
-    current_indent = ' ' * (indent * 4)
-    builtins = builtin_functions()
-
-    if not obj.elements:
+def _compile_form(obj: Form, indent: int = 0):
+    elements = obj.elements
+    if not elements:
         return ""
-    if not isinstance(obj.elements[0], Atom):
-        raise SyntaxError(f"Expected Atom as first element of Form, but got {obj.elements[0]}")
 
-    form_name = obj.elements[0].value
-    if form_name in builtins:
-        return f"{current_indent}{compile_builtin(obj)}"
+    first = elements[0]
+    if type(first) is not Atom:
+        raise SyntaxError(f"Expected Atom as first element of Form, but got {first}")
+
+    form_name = first.value
+    if form_name in _BUILTINS:
+        return f"{_indent(indent)}{compile_builtin(obj)}"
+    args = ','.join([compile_obj(element) for element in elements[1:]])
+    return f"{_indent(indent)}{form_name}({args})"
+
+
+def _create_body(elements: list, delim: str):
+    return delim.join([compile_obj(element) for element in elements])
+
+
+def _emit_import(tail: list):
+    return f"import {tail[0].value}"
+
+
+def _emit_print(tail: list):
+    return f"print({_create_body(tail, ', ')})"
+
+
+def _emit_add(tail: list):
+    return _create_body(tail, ' + ')
+
+
+def _emit_sub(tail: list):
+    return _create_body(tail, ' - ')
+
+
+def _emit_mul(tail: list):
+    return _create_body(tail, ' * ')
+
+
+def _emit_div(tail: list):
+    return _create_body(tail, ' / ')
+
+
+def _emit_not(tail: list):
+    return ' not ' + compile_obj(tail[0])
+
+
+def _emit_infix(op: str, tail: list):
+    return _create_body(tail, f' {op} ')
+
+
+def _emit_comparison(op: str, tail: list):
+    return f"{compile_obj(tail[0])} {op} {compile_obj(tail[1])}"
+
+
+def _emit_eq(tail: list):
+    return f"{compile_obj(tail[0])} == {compile_obj(tail[1])}"
+
+
+def _emit_list(tail: list):
+    return f"list_create({_create_body(tail, ', ')})"
+
+
+def _emit_first(tail: list):
+    return f"{compile_obj(tail[0])}[0]"
+
+
+def _emit_rest(tail: list):
+    return f"{compile_obj(tail[0])}[1:]"
+
+
+def _emit_list_append(tail: list):
+    return f"list_append({_create_body(tail, ', ')})"
+
+
+def _emit_map(tail: list):
+    func = compile_obj(tail[0])
+    collection = compile_obj(tail[1])
+    return f"list(map({func}, {collection}))"
+
+
+def _emit_filter(tail: list):
+    func = compile_obj(tail[0])
+    collection = compile_obj(tail[1])
+    return f"list(filter({func}, {collection}))"
+
+
+def _emit_lambda(tail: list):
+    args = tail[0]
+    if isinstance(args, Atom):
+        args = compile_obj(args)
+    elif isinstance(args, Form):
+        args = _create_body(args.elements, ', ')
     else:
-        args = ','.join([compile_obj(element) for element in islice(obj.elements, 1, len(obj.elements))])
-        return f"{current_indent}{form_name}({args})"
+        raise TypeError(f"Expected Form or Atom but got {type(args)}")
+    return f"lambda {args}: {compile_obj(tail[1])}"
+
+
+def _emit_if(tail: list):
+    condition = compile_obj(tail[0])
+    if_branch = compile_obj(tail[1])
+    else_branch = compile_obj(tail[2])
+    return f"({if_branch}) if ({condition}) else ({else_branch})"
+
+
+_BUILTIN_EMIT: dict[str, BuiltinEmitter] = {
+    "import": _emit_import,
+    "print": _emit_print,
+    "+": _emit_add,
+    "-": _emit_sub,
+    "*": _emit_mul,
+    "/": _emit_div,
+    "not": _emit_not,
+    "and": partial(_emit_infix, "and"),
+    "or": partial(_emit_infix, "or"),
+    "<": partial(_emit_comparison, "<"),
+    ">": partial(_emit_comparison, ">"),
+    "<=": partial(_emit_comparison, "<="),
+    ">=": partial(_emit_comparison, ">="),
+    "=": _emit_eq,
+    "list": _emit_list,
+    "first": _emit_first,
+    "rest": _emit_rest,
+    "++": _emit_list_append,
+    "map": _emit_map,
+    "filter": _emit_filter,
+    "lambda": _emit_lambda,
+    "if": _emit_if,
+}
+
+
+_ONE_ARGUMENT = "'{name}' takes 1 argument but {given} were given!"
+_TWO_ARGUMENTS = "'{name}' takes 2 arguments but {given} were given!"
+
+_ARITIES: dict[str, tuple[int, str]] = {
+    "not": (1, _ONE_ARGUMENT),
+    "first": (1, _ONE_ARGUMENT),
+    "rest": (1, _ONE_ARGUMENT),
+    "<": (2, _TWO_ARGUMENTS),
+    ">": (2, _TWO_ARGUMENTS),
+    "<=": (2, _TWO_ARGUMENTS),
+    ">=": (2, _TWO_ARGUMENTS),
+    "=": (2, _TWO_ARGUMENTS),
+    "map": (2, _TWO_ARGUMENTS),
+    "filter": (2, _TWO_ARGUMENTS),
+    "if": (3, "if requires 3 arguments but {given} were given!"),
+}
 
 
 def compile_builtin(form: Form):
-    function_name = form.elements[0].value
-
-    def create_body(delim: str, elements: islice | list = islice(form.elements, 1, len(form.elements))):
-        return delim.join([compile_obj(element) for element in elements])
-
-    def create_op(op: str, form: Form, n_args: int = 2):
-        args = len(form.elements) - 1
-        if args != n_args:
-            raise TypeError(f"'{op}' takes {n_args} arguments but {args} were given!")
-        return create_body(f' {op} ')
-
-    match function_name:
-        case "import":
-            return f"import {form.elements[1].value}"
-        case "print":
-            return f"print({create_body(', ')})"
-        case "+":
-            return create_body(' + ')
-        case "-":
-            return create_body(' - ')
-        case "*":
-            return create_body(' * ')
-        case "/":
-            return create_body(' / ')
-        case "not":
-            n_args = len(form.elements) - 1
-            if n_args != 1:
-                raise TypeError(f"'not' takes 1 argument but {n_args} were given!")
-            return ' not ' + create_body('')
-        case "and" | "or":
-            return create_body(f' {function_name} ')
-        case "<" | ">" | "<=" | ">=":
-            return create_op(function_name, form)
-        case "=":
-            n_args = len(form.elements) - 1
-            if n_args != 2:
-                raise TypeError(f"'=' takes 2 arguments but {n_args} were given!")
-            return create_body(' == ')
-        case "list":
-            return f"list_create({create_body(', ')})"
-        case "first":
-            n_args = len(form.elements) - 1
-            if n_args != 1:
-                raise TypeError(f"'first' takes 1 argument but {n_args} were given!")
-            return f"{create_body('')}[0]"
-        case "rest":
-            n_args = len(form.elements) - 1
-            if n_args != 1:
-                raise TypeError(f"'rest' takes 1 argument but {n_args} were given!")
-            return f"{create_body('')}[1:]"
-        case "++":
-            return f"list_append({create_body(', ')})"
-        case "map":
-            n_args = len(form.elements) - 1
-            if n_args != 2:
-                raise TypeError(f"'map' takes 2 arguments but {n_args} were given!")
-
-            func = compile_obj(form.elements[1])
-            collection = compile_obj(form.elements[2])
-            return f"list(map({func}, {collection}))"
-        case "filter":
-            n_args = len(form.elements) - 1
-            if n_args != 2:
-                raise TypeError(f"'filter' takes 2 arguments but {n_args} were given!")
-
-            func = compile_obj(form.elements[1])
-            collection = compile_obj(form.elements[2])
-            return f"list(filter({func}, {collection}))"
-        case "lambda":
-            args = form.elements[1]
-            if isinstance(args, Atom):
-                args = compile_obj(args)
-            elif isinstance(args, Form):
-                args = create_body(', ', args.elements)
-            else:
-                raise TypeError(f"Expected Form or Atom but got {type(args)}")
-            return f"lambda {args}: {compile_obj(form.elements[2])}"
-        case "if":
-            n_args = len(form.elements) - 1
-            if n_args != 3:
-                raise TypeError(f"if requires 3 arguments but {n_args} were given!")
-
-            condition = compile_obj(form.elements[1])
-            if_branch = compile_obj(form.elements[2])
-            else_branch = compile_obj(form.elements[3])
-            return f"({if_branch}) if ({condition}) else ({else_branch})"
-    return ""
+    elements = form.elements
+    function_name = elements[0].value
+    handler = _BUILTIN_EMIT.get(function_name)
+    if handler is None:
+        return ""
+
+    tail = elements[1:]
+    arity = _ARITIES.get(function_name)
+    if arity is not None and len(tail) != arity[0]:
+        raise TypeError(arity[1].format(name=function_name, given=len(tail)))
+    return handler(tail)
+
+
+def _create_function_body(body: list, indent: int, add_return: bool):
+    total_indent = _indent(indent + 1)
+    last = len(body) - 1
+    lines = [f"{total_indent}{'return ' if add_return and i == last else ''}{compile_obj(obj, indent)}"
+             for i, obj in enumerate(body)]
+    return '\n'.join(lines)
 
 
 def compile_function(function: Function, indent: int):
-    builtins = builtin_functions()
-    if function.name in builtins:
+    if function.name in _BUILTINS:
         logger.error(f"Error: builtin function {function.name} is being redefined.")
 
-    def create_body(add_return: bool):
-        return_f = lambda i: 'return ' if add_return and i == len(function.body) - 1 else ''
-        total_indent = ' ' * (indent + 1) * 4
-        body = [f"{total_indent}{return_f(i)}{compile_obj(obj, indent)}" for i, obj in enumerate(function.body)]
-        return '\n'.join(body)
-
     if function.name == "main":
-        output = f"if __name__ == '__main__':\n{create_body(False)}\n"
+        output = f"if __name__ == '__main__':\n{_create_function_body(function.body, indent, False)}\n"
     else:
-        output = f"def {function.name}({', '.join(function.args)}):\n{create_body(True)}"
+        output = f"def {function.name}({', '.join(function.args)}):\n{_create_function_body(function.body, indent, True)}"
 
     return output + "\n"
 
@@ -156,21 +224,28 @@ def compile_program(ast: AST) -> tuple[bool, str]:
     if not ast.children:
         return True, ""
 
-    objects = [to_object(child) for child in ast.children]
-    for obj in objects:
+    functions = {}
+    imports = []
+    for child in ast.children:
+        obj = to_object(child)
         if not isinstance(obj, Form):
             return False, f"Got unexpected object at root-level: {obj}"
-        if not is_function_def(obj) and is_import(obj):
+        if is_function_def(obj):
+            functions[obj.elements[1].value] = to_function(obj)
+        elif is_import(obj):
+            if len(obj.elements) != 2 or type(obj.elements[1]) is not Atom:
+                return False, f"Malformed import at root-level: {obj}"
+            imports.append(obj)
+        else:
             return False, f"Expected only function definitions and imports at root-level but got: {obj}"
 
-    functions = {form.elements[1].value: to_function(form) for form in objects if is_function_def(form)}
-
     # todo should be limited to the entry point file
     if 'main' not in functions:
         return False, f"Function 'main' is not defined!"
 
-    output = "from lisp_core import *\n\n"
-    for function in functions.values():
-        output += compile_function(function, 0) + "\n"
+    parts = ["from lisp_core import *\n"]
+    parts.extend(compile_obj(form) + "\n" for form in imports)
+    parts.append("\n")
+    parts.extend(compile_function(function, 0) + "\n" for function in functions.values())
 
-    return True, output
+    return True, "".join(parts)
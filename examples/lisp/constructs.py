@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from itertools import islice
 from typing import Self
 from pydantic import BaseModel
@@ -6,13 +7,21 @@ from examples.lisp.grammar import LispRule
 from parser.ast import AST
 
 
-class Atom(BaseModel):
+@dataclass(slots=True)
+class Atom:
     value: str | int | float
 
+    def __str__(self):
+        return f"value={self.value!r}"
 
-class Form(BaseModel):
+
+@dataclass(slots=True)
+class Form:
     elements: list[Self | Atom]
 
+    def __str__(self):
+        return f"elements={self.elements!r}"
+
 
 class EmptyForm:
     pass
@@ -67,9 +76,9 @@ def to_function(form: Form):
 
 def is_function_def(form: Form):
     first_element = form.elements[0]
-    return isinstance(first_element, Atom) and first_element.value == 'fun'
+    return type(first_element) is Atom and first_element.value == 'fun'
 
 
 def is_import(form: Form):
     first_element = form.elements[0]
-    return isinstance(first_element, Atom) and first_element.value == 'import'
+    return type(first_element) is Atom and first_element.value == 'import'
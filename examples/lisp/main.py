@@ -32,4 +32,4 @@ if __name__ == "__main__":
         else:
             with open("lisp.py", "w") as file:
                 file.write(output)
-            exec(output)
+            exec(compile(output, "lisp.py", "exec"))
@@ -0,0 +1,58 @@
+import pytest
+
+from examples.lisp.compiler import compile_obj, compile_program
+from examples.lisp.constructs import Atom, Form
+from examples.lisp.grammar import create_parser, lexer, LispRule
+
+
+def form(*values: str):
+    return Form(elements=[Atom(value=value) for value in values])
+
+
+def compile_source(text: str):
+    result, ast, remaining = create_parser()(lexer()(text))
+    assert result and not remaining
+    return compile_program(ast.prune(excluded={LispRule.PROGRAM}, use_child_rule={LispRule.ELEMENT, LispRule.ELEMENTS}))
+
+
+def test_builtin_arity_errors():
+    with pytest.raises(TypeError, match="^'not' takes 1 argument but 2 were given!$"):
+        compile_obj(form("not", "x", "y"))
+    with pytest.raises(TypeError, match="^'first' takes 1 argument but 0 were given!$"):
+        compile_obj(form("first"))
+    with pytest.raises(TypeError, match="^'rest' takes 1 argument but 2 were given!$"):
+        compile_obj(form("rest", "xs", "ys"))
+    with pytest.raises(TypeError, match="^'=' takes 2 arguments but 1 were given!$"):
+        compile_obj(form("=", "x"))
+    with pytest.raises(TypeError, match="^if requires 3 arguments but 2 were given!$"):
+        compile_obj(form("if", "x", "y"))
+
+
+def test_program_header():
+    result, output = compile_source("(fun main () (print 1))")
+
+    assert result
+    assert output.startswith("from lisp_core import *\n\nif __name__ == '__main__':\n")
+
+
+def test_program_imports():
+    result, output = compile_source("(import math) (fun main () (print 1))")
+
+    assert result
+    assert output.startswith("from lisp_core import *\nimport math\n\nif __name__ == '__main__':\n")
+
+
+def test_program_rejects_other_root_forms():
+    result, output = compile_source("(print 2) (fun main () (print 1))")
+
+    assert not result
+    assert output == ("Expected only function definitions and imports at root-level but got: "
+                      "elements=[Atom(value='print'), Atom(value='2')]")
+
+
+def test_program_rejects_malformed_imports():
+    for source in ["(import)", "(import (a b))", "(import a b)"]:
+        result, output = compile_source(f"{source} (fun main () (print 1))")
+
+        assert not result
+        assert output.startswith("Malformed import at root-level:")
@@ -17,11 +17,13 @@ def match_str(rule_id: Optional[RuleId], s: str) -> Combinator[RuleId, str]:
     return inner
 
 
-def match_regex(rule_id: Optional[RuleId], pattern) -> Combinator[RuleId, str]:
+def match_regex(rule_id: Optional[RuleId], pattern: str | re.Pattern) -> Combinator[RuleId, str]:
+    compiled = re.compile(pattern)
+
     def inner(tokens: TokenStream):
         if tokens:
             token, remaining = tokens.advance()
-            if re.match(pattern, token):
+            if compiled.match(token):
                 return ParserResult.succeeded(AST(rule_id, [token]), remaining)
         return ParserResult.failed(tokens)
 
@@ -1,3 +1,5 @@
+import re
+
 from parser.ast import AST
 from parser.string_combinators import match_str, match_regex
 from parser.token_stream import TokenStream
@@ -20,3 +22,11 @@ def test_regex():
     assert (parser(TokenStream(["for"])) ==
             ParserResult.succeeded(AST("FOR-LOOP", ["for"], None), TokenStream(["for"]).advance()[1]))
     assert parser(TokenStream(["for2"])) == ParserResult.failed(TokenStream(["for2"]))
+
+
+def test_regex_compiled_pattern():
+    parser = match_regex("FOR-LOOP", re.compile("for$"))
+
+    assert (parser(TokenStream(["for"])) ==
+            ParserResult.succeeded(AST("FOR-LOOP", ["for"], None), TokenStream(["for"]).advance()[1]))
+    assert parser(TokenStream(["for2"])) == ParserResult.failed(TokenStream(["for2"]))